@@ -1,26 +1,57 @@
 import os
 import io
+import csv
 import base64
 import json
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
 
-import requests
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 
+if TYPE_CHECKING:
+    import requests  # imported lazily at runtime, in _gh_session
+
 # =========================
 # Constants
 # =========================
 ELEMENT_TYPES = ['role', 'goal', 'audience', 'context', 'output', 'tone']
+# Heading used for each section in the generated prompt
+SECTION_TITLES = {
+    'role': 'Role', 'goal': 'Goal', 'audience': 'Target Audience',
+    'context': 'Context', 'output': 'Output', 'tone': 'Tone',
+}
+MULTI_SECTIONS = {'audience', 'context', 'output'}
 CSV_COLUMNS = ['title', 'type', 'content']
 PROMPT_HISTORY_COLUMNS = ['name', 'timestamp', 'prompt']
+# Natural keys used when merging backups (the newer row wins)
+CSV_KEY = ['title', 'type']
+PROMPT_HISTORY_KEY = ['name', 'timestamp']
+_RECURSIVE_FEEDBACK = (
+    "Before you provide the response, please ask me any questions that you feel could "
+    "help you craft a better response. If you feel you have enough information to craft this response, "
+    "please just provide it."
+)
+FLUSH_THRESHOLD = 8  # buffered rows per file before a write is forced
+# Files whose new rows are buffered in the session when writes go to GitHub
+BUFFERED_FILES = {
+    'prompt_elements.csv': CSV_COLUMNS,
+    'prompt_history.csv': PROMPT_HISTORY_COLUMNS,
+}
+# Widget keys whose values must survive while their section isn't rendered
+PERSISTED_KEY_PREFIXES = (
+    'select_', 'custom_', 'new_', 'filter_type', 'prompt_name', 'generated_prompt',
+    'auto_update_prompt', 'recursive_feedback', 'view_prompt',
+)
 
 # =========================
 # Theme / Styling (dark + red accent)
 # =========================
-def set_theme():
-    st.markdown("""
+_THEME_CSS = """
     <style>
     :root {
         --background: #0b0b0c;
@@ -33,17 +64,18 @@ def set_theme():
     }
     .stApp { background: var(--background); color: var(--text); }
 
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"]{
+    /* Section nav (horizontal radio styled as tabs) */
+    .stRadio [role="radiogroup"]{
         display:flex; gap:6px; padding-bottom:2px;
         border-bottom:1px solid var(--border); align-items:center;
     }
-    .stTabs [data-baseweb="tab"]{
-        background:#121214; color:var(--muted-text);
+    .stRadio [role="radiogroup"] label{
+        background:#121214; color:var(--muted-text); margin:0;
         border-radius:6px 6px 0 0; padding:8px 14px;
         border-bottom:2px solid transparent;
     }
-    .stTabs [aria-selected="true"]{
+    .stRadio [role="radiogroup"] label > div:first-of-type{ display:none; }
+    .stRadio [role="radiogroup"] label:has(input:checked){
         color:var(--text); background:#161618; border-bottom-color:var(--accent);
     }
 
@@ -71,32 +103,63 @@ def set_theme():
     }
     .stButton > button:hover { border-color: var(--accent) !important; }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
 # =========================
 # GitHub Helpers (safe if secrets missing)
 # =========================
+# Memo for _gh_available; the script re-executes on every rerun, so this resets each run
+_GH_OK = None
+
 def _gh_available() -> bool:
-    try:
-        g = st.secrets.get("github", None)
-        return bool(g) and {"token", "owner", "repo"}.issubset(g.keys())
-    except Exception:
-        return False
+    global _GH_OK
+    if _GH_OK is None:
+        try:
+            g = st.secrets.get("github", None)
+            _GH_OK = bool(g) and {"token", "owner", "repo"}.issubset(g.keys())
+        except Exception:
+            _GH_OK = False
+    return _GH_OK
 
 def _gh_headers() -> Dict[str, str]:
     g = st.secrets["github"]
     return {"Authorization": f"Bearer {g['token']}", "Accept": "application/vnd.github+json"}
 
+@st.cache_resource
+def _gh_session() -> "requests.Session":
+    # Imported here: local-only runs never pay for loading requests
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+    # One pooled session per process: reuses the TCP/TLS connection across calls
+    s = requests.Session()
+    s.headers.update(_gh_headers())
+    # Rate limits and transient 5xx get bounded, backed-off retries (honouring Retry-After);
+    # the final response is still returned so callers' own status handling applies
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET", "PUT"], respect_retry_after_header=True,
+                  raise_on_status=False)
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry))
+    return s
+
 def _gh_info() -> Tuple[str, str, str, str]:
     g = st.secrets["github"]
     return g["owner"], g["repo"], g.get("branch", "main"), g.get("path_prefix", "data")
 
+_GH_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+
 def _gh_api_base(owner: str, repo: str) -> str:
     return f"https://api.github.com/repos/{owner}/{repo}"
 
-def _gh_get_file(owner: str, repo: str, branch: str, path: str):
+@st.cache_resource
+def _gh_shas() -> Dict[str, str]:
+    # Blob sha per path; process-wide so the background writer thread can use it too
+    return {}
+
+def _gh_get_file(owner: str, repo: str, branch: str, path: str, etag: str = None):
     url = f"{_gh_api_base(owner, repo)}/contents/{path}?ref={branch}"
-    return requests.get(url, headers=_gh_headers())
+    headers = {"If-None-Match": etag} if etag else None
+    return _gh_session().get(url, headers=headers, timeout=_GH_TIMEOUT)
 
 def _gh_get_file_sha(owner: str, repo: str, branch: str, path: str):
     r = _gh_get_file(owner, repo, branch, path)
@@ -107,84 +170,393 @@ def _gh_get_file_sha(owner: str, repo: str, branch: str, path: str):
             return None
     return None
 
-def _gh_read_csv(filename: str):
+def _gh_read_file(filename: str):
+    """Raw bytes of data/<filename> on GitHub, or None if unavailable/missing."""
     if not _gh_available():
         return None
+    queued = _gh_writer().pending(filename)
+    if queued is not None:
+        # A save for this file hasn't reached GitHub yet; it is the newest content
+        return queued
     try:
         owner, repo, branch, prefix = _gh_info()
         path = f"{prefix}/{filename}"
-        r = _gh_get_file(owner, repo, branch, path)
+        # Conditional GET: a 304 means our last copy is still current
+        cache = st.session_state.setdefault("_gh_cache", {})
+        key = (owner, repo, branch, path)
+        hit = cache.get(key)
+        r = _gh_get_file(owner, repo, branch, path, etag=hit["etag"] if hit else None)
+        if r.status_code == 304 and hit:
+            return hit["content"]
         if r.status_code == 200:
-            content_b64 = r.json()["content"]
-            content = base64.b64decode(content_b64).decode("utf-8")
-            return io.StringIO(content)
+            body = r.json()
+            # Remember the blob sha so the next write can skip its GET
+            _gh_shas()[path] = body.get("sha")
+            content = base64.b64decode(body["content"])
+            if r.headers.get("ETag"):
+                cache[key] = {"etag": r.headers["ETag"], "content": content}
+            return content
         return None
     except Exception:
         return None
 
-def _gh_write_csv(filename: str, df: pd.DataFrame, message: str = "update data") -> bool:
+def _gh_write_file(filename: str, data: bytes, message: str = "update data") -> bool:
     if not _gh_available():
         raise RuntimeError("GitHub secrets not configured")
     owner, repo, branch, prefix = _gh_info()
     path = f"{prefix}/{filename}"
-    csv_buf = io.StringIO()
-    df.to_csv(csv_buf, index=False)
-    content_b64 = base64.b64encode(csv_buf.getvalue().encode("utf-8")).decode("utf-8")
-    sha = _gh_get_file_sha(owner, repo, branch, path)
+    content_b64 = base64.b64encode(data).decode("ascii")
+    shas = _gh_shas()
+    sha = shas.get(path) or _gh_get_file_sha(owner, repo, branch, path)
     payload = {"message": message, "content": content_b64, "branch": branch}
     if sha:
         payload["sha"] = sha
     url = f"{_gh_api_base(owner, repo)}/contents/{path}"
-    r = requests.put(url, headers=_gh_headers(), data=json.dumps(payload))
+    r = _gh_session().put(url, data=json.dumps(payload), timeout=_GH_TIMEOUT)
+    if r.status_code in (409, 422):
+        # Cached sha is stale (someone else wrote the file): refetch once and retry
+        payload["sha"] = _gh_get_file_sha(owner, repo, branch, path)
+        r = _gh_session().put(url, data=json.dumps(payload), timeout=_GH_TIMEOUT)
     r.raise_for_status()
+    shas[path] = r.json().get("content", {}).get("sha")
     return True
 
 # =========================
 # Data Manager (GitHub-first, local fallback)
 # =========================
+_ELEM_DTYPES = {'title': 'string', 'type': 'category', 'content': 'string'}
+_HIST_DTYPES = {'name': 'string', 'prompt': 'string'}
+# Arrow's multithreaded CSV reader when available; the C engine otherwise
+_CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+def _type_categorical(s: pd.Series) -> pd.Categorical:
+    """ELEMENT_TYPES first (all assignable, even if unused), then any other types in the data."""
+    extra = sorted(set(s.dropna().unique()) - set(ELEMENT_TYPES))
+    return pd.Categorical(s, categories=ELEMENT_TYPES + extra)
+
+def _normalize(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Bring a freshly read frame to the app's schema (shared by CSV and Parquet)."""
+    dtype = _ELEM_DTYPES if columns == CSV_COLUMNS else _HIST_DTYPES
+    # One reindex adds any missing columns and fixes the column order (skipped when aligned)
+    if df.columns.tolist() != columns:
+        df = df.reindex(columns=columns)
+    # Empty text cells become "" (widgets reject pd.NA)
+    text = [c for c in columns if dtype.get(c) == 'string']
+    df[text] = df[text].fillna('')
+    if 'type' in df.columns:
+        df['type'] = _type_categorical(df['type'])
+    if 'timestamp' in df.columns:
+        # Parsed after the reindex so files without the column still load
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+    return df
+
+def _read_csv(src, columns: List[str]) -> pd.DataFrame:
+    """Parse one of our CSVs with a fixed schema instead of dtype inference."""
+    dtype = _ELEM_DTYPES if columns == CSV_COLUMNS else _HIST_DTYPES
+    # No usecols (pyarrow rejects a callable); _normalize's reindex drops extra columns
+    df = pd.read_csv(src, engine=_CSV_ENGINE, dtype=dtype)
+    return _normalize(df, columns)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _parse_bytes(raw: bytes, columns: Tuple[str, ...], fmt: str = "csv") -> pd.DataFrame:
+    """Parse file contents; unchanged bytes skip parsing even after _load_csv is cleared."""
+    if fmt == "parquet":
+        return _normalize(pd.read_parquet(io.BytesIO(raw), engine="pyarrow"), list(columns))
+    return _read_csv(io.BytesIO(raw), list(columns))
+
+class _BackgroundWriter:
+    """Runs write(filename, data) on a daemon thread so saves don't block the rerun.
+
+    The newest bytes per file win (a burst of saves becomes one write); until they
+    are written, reads are served from memory. A failed write stays queued and is
+    retried every RETRY_DELAY seconds; errors() lists files that haven't made it yet.
+    """
+    RETRY_DELAY = 15
+
+    def __init__(self, name: str, write):
+        self._write = write
+        self._pending: Dict[str, bytes] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, filename: str, data: bytes) -> None:
+        with self._cond:
+            self._pending[filename] = data
+            self._cond.notify_all()
+
+    def pending(self, filename: str):
+        with self._cond:
+            return self._pending.get(filename)
+
+    def wait(self, filename: str) -> bool:
+        """Block until filename's queued write lands (True) or has failed (False)."""
+        with self._cond:
+            self._cond.wait_for(lambda: filename not in self._pending or filename in self._errors)
+            return filename not in self._pending
+
+    def errors(self) -> Dict[str, Exception]:
+        """Last error per file whose write is still failing."""
+        with self._cond:
+            return dict(self._errors)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                filename, data = next(iter(self._pending.items()))
+            try:
+                self._write(filename, data)
+            except Exception as e:
+                with self._cond:
+                    self._errors[filename] = e
+                    # Keep the (newest) bytes queued, behind any other files, and pause;
+                    # a new submit wakes the thread early
+                    self._pending[filename] = self._pending.pop(filename)
+                    self._cond.notify_all()
+                    self._cond.wait(self.RETRY_DELAY)
+                continue
+            with self._cond:
+                self._errors.pop(filename, None)
+                if self._pending.get(filename) is data:
+                    del self._pending[filename]
+                self._cond.notify_all()
+
+def _write_local_file(filename: str, data: bytes) -> None:
+    # Write a sibling temp file, then swap it in: readers never see a partial file
+    tmp = filename + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+@st.cache_resource
+def _local_writer() -> _BackgroundWriter:
+    return _BackgroundWriter("local-writer", _write_local_file)
+
+@st.cache_resource
+def _gh_writer() -> _BackgroundWriter:
+    # PUTs leave the script thread; a failed one stays queued (and readable) until it lands
+    return _BackgroundWriter(
+        "github-writer",
+        lambda filename, data: _gh_write_file(filename, data, message=f"update {filename}"),
+    )
+
+def _read_local(filename: str):
+    """Bytes of a local data file (including a queued write), or None if it doesn't exist."""
+    data = _local_writer().pending(filename)
+    if data is None and os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+    return data
+
+def _storage_format() -> str:
+    """'csv' (default) or 'parquet', from an optional [storage] format = "..." secret."""
+    try:
+        return st.secrets.get("storage", {}).get("format", "csv")
+    except Exception:
+        return "csv"
+
+def _parquet_name(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".parquet"
+
+def _to_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "parquet":
+        return df.to_parquet(index=False, engine="pyarrow", compression="zstd")
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+def _load_parquet(filename: str, columns: List[str]):
+    """Parquet copy of filename (GitHub first, then local), or None if there isn't one yet."""
+    name = _parquet_name(filename)
+    try:
+        raw = _gh_read_file(name)
+        if raw is not None:
+            return _parse_bytes(raw, tuple(columns), "parquet")
+    except Exception as e:
+        st.warning(f"GitHub load failed for {name}: {e}")
+    raw = _read_local(name)
+    if raw is not None:
+        return _parse_bytes(raw, tuple(columns), "parquet")
+    return None
+
+def _rows_to_frame(rows: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=columns)
+    if 'timestamp' in df.columns:
+        # Match the parsed column of loaded history so concat keeps one dtype
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    return df
+
+def _append_csv_lines(raw: bytes, columns: List[str], rows: List[Dict[str, Any]]) -> bytes:
+    """raw CSV bytes with rows appended, written the same way as append_row."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, lineterminator=os.linesep)
+    if not raw.endswith(b'\n'):
+        out.write(os.linesep)
+    writer.writerows(rows)
+    return raw + out.getvalue().encode("utf-8")
+
+@st.cache_data(show_spinner=False, ttl=300)
+def _load_csv(filename: str, columns: Tuple[str, ...]) -> pd.DataFrame:
+    columns = list(columns)
+    if _storage_format() == "parquet":
+        df = _load_parquet(filename, columns)
+        if df is not None:
+            return df
+        # No Parquet copy yet: read the CSV; the next save writes Parquet
+    # Try GitHub first
+    try:
+        raw = _gh_read_file(filename)
+        if raw is not None:
+            return _parse_bytes(raw, tuple(columns))
+    except Exception as e:
+        st.warning(f"GitHub load failed for {filename}: {e}")
+
+    # Fallback local (ephemeral on Streamlit Cloud)
+    raw = _read_local(filename)
+    if raw is None:
+        df = pd.DataFrame(columns=columns)
+        df.to_csv(filename, index=False)
+        return df
+    return _parse_bytes(raw, tuple(columns))
+
+# Frames already loaded in this run. The script module re-executes on every rerun,
+# so this starts empty each run; _write also empties it.
+_RUN_FRAMES: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame] = {}
+
 class DataManager:
     @staticmethod
     def load_data(filename: str, columns: List[str]) -> pd.DataFrame:
-        # Try GitHub first
-        try:
-            buf = _gh_read_csv(filename)
-            if buf is not None:
-                df = pd.read_csv(buf)
-                for c in columns:
-                    if c not in df.columns:
-                        df[c] = pd.Series(dtype="object")
-                return df[columns] if not df.empty else pd.DataFrame(columns=columns)
-        except Exception as e:
-            st.warning(f"GitHub load failed for {filename}: {e}")
-
-        # Fallback local (ephemeral on Streamlit Cloud)
-        if not os.path.exists(filename):
-            df = pd.DataFrame(columns=columns)
-            df.to_csv(filename, index=False)
-            return df
-        df = pd.read_csv(filename)
-        for c in columns:
-            if c not in df.columns:
-                df[c] = pd.Series(dtype="object")
-        return df[columns] if not df.empty else pd.DataFrame(columns=columns)
+        # Cached across reruns; save_data clears it after every write. Within a run the
+        # same frame is shared (callers never modify it in place) instead of re-copied.
+        key = (filename, tuple(columns))
+        if key not in _RUN_FRAMES:
+            _RUN_FRAMES[key] = _load_csv(*key)
+        return _RUN_FRAMES[key]
+
+    @staticmethod
+    def prefetch(filenames: List[str]) -> None:
+        """Warm the load cache for several files at once (concurrent GitHub GETs on a cold cache)."""
+        if not _gh_available() or len(filenames) < 2:
+            return
+        ctx = get_script_run_ctx()
+
+        def load(name: str) -> None:
+            # Worker threads need the script context for st.secrets / st.session_state
+            add_script_run_ctx(threading.current_thread(), ctx)
+            DataManager.load_data(name, BUFFERED_FILES[name])
+
+        with ThreadPoolExecutor(max_workers=min(4, len(filenames))) as pool:
+            list(pool.map(load, filenames))
 
     @staticmethod
     def save_data(df: pd.DataFrame, filename: str) -> None:
-        # Try GitHub
-        try:
-            _gh_write_csv(filename, df, message=f"update {filename}")
+        fmt = _storage_format()
+        target = _parquet_name(filename) if fmt == "parquet" else filename
+        DataManager._write(target, _to_bytes(df, fmt))
+
+    @staticmethod
+    def _writer() -> Tuple[_BackgroundWriter, str]:
+        # GitHub when configured, local disk otherwise; both write in the background
+        if _gh_available():
+            return _gh_writer(), "GitHub"
+        return _local_writer(), "Local"
+
+    @staticmethod
+    def _write(target: str, data: bytes) -> None:
+        DataManager._writer()[0].submit(target, data)
+        # Invalidate cached loads so the next rerun sees the write
+        _load_csv.clear()
+        _RUN_FRAMES.clear()
+
+    @staticmethod
+    def append_row(filename: str, columns: List[str], row: Dict[str, Any]) -> None:
+        """Append a single row; on local disk only the new line is written."""
+        # Neither GitHub nor Parquet can append: read-modify-write the whole file. Locally,
+        # a queued whole-file write must land first so the append isn't overwritten; if
+        # that write keeps failing, the row goes onto the queued bytes the same way.
+        if _gh_available() or _storage_format() == "parquet" or not _local_writer().wait(filename):
+            df = DataManager.load_data(filename, columns)
+            df = pd.concat([df, _rows_to_frame([row], columns)], ignore_index=True)
+            DataManager.save_data(df, filename)
             return
-        except Exception as e:
-            st.warning(f"GitHub save failed for {filename}: {e}")
-        # Fallback local
-        df.to_csv(filename, index=False)
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        needs_newline = False
+        if size:
+            # Check the last byte in binary: a text-mode seek could land inside a multibyte character
+            with open(filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            if needs_newline:
+                f.write(os.linesep)
+            writer = csv.DictWriter(f, fieldnames=columns, lineterminator=os.linesep)
+            if not size:
+                writer.writeheader()
+            writer.writerow(row)
+        _load_csv.clear()
+        _RUN_FRAMES.clear()
+
+    @staticmethod
+    def buffer_row(filename: str, row: Dict[str, Any]) -> bool:
+        """Queue a new row; flush() writes the whole batch in one save.
+
+        Returns True if the row was written, False if it is still only in this session.
+        """
+        columns = BUFFERED_FILES[filename]
+        if not _gh_available():
+            DataManager.append_row(filename, columns, row)
+            return True
+        buf = st.session_state.setdefault('_row_buf', {}).setdefault(filename, [])
+        buf.append(row)
+        if len(buf) >= FLUSH_THRESHOLD:
+            DataManager.flush(filename)
+            return True
+        return False
+
+    @staticmethod
+    def flush(filename: str = None) -> None:
+        """Write buffered rows for one file, or for every file when None."""
+        pending = st.session_state.get('_row_buf', {})
+        for name in ([filename] if filename else list(pending)):
+            buf = pending.get(name)
+            if not buf:
+                continue
+            columns = BUFFERED_FILES[name]
+            raw = _gh_read_file(name) if _storage_format() == "csv" else None
+            if raw:
+                # CSV is plain text: add the new lines to the current file instead of re-serializing it
+                DataManager._write(name, _append_csv_lines(raw, columns, buf))
+            else:
+                df = DataManager.load_data(name, columns)
+                df = pd.concat([df, _rows_to_frame(buf, columns)], ignore_index=True)
+                DataManager.save_data(df, name)
+            pending[name] = []
+
+    @staticmethod
+    def pending_count() -> int:
+        return sum(len(b) for b in st.session_state.get('_row_buf', {}).values())
+
+    @staticmethod
+    def load_pending(filename: str) -> pd.DataFrame:
+        """Saved rows plus any still buffered in this session."""
+        columns = BUFFERED_FILES[filename]
+        df = DataManager.load_data(filename, columns)
+        buf = st.session_state.get('_row_buf', {}).get(filename)
+        if buf:
+            df = pd.concat([df, _rows_to_frame(buf, columns)], ignore_index=True)
+        return df
+
+    @staticmethod
+    def save_prompt(name: str, prompt: str) -> bool:
+        row = {'name': name, 'timestamp': datetime.now().isoformat(sep=' ', timespec='seconds'), 'prompt': prompt}
+        return DataManager.buffer_row('prompt_history.csv', row)
 
     @staticmethod
-    def save_prompt(name: str, prompt: str) -> None:
-        df = DataManager.load_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
-        new_row = pd.DataFrame({'name': [name], 'timestamp': [datetime.now()], 'prompt': [prompt]})
-        df = pd.concat([df, new_row], ignore_index=True)
-        DataManager.save_data(df, 'prompt_history.csv')
+    def load_history() -> pd.DataFrame:
+        return DataManager.load_pending('prompt_history.csv')
 
 # =========================
 # UI Components
@@ -204,15 +576,18 @@ class ElementCreator:
                 if not title:
                     st.error("Title is required.")
                 else:
-                    df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
-                    new_row = pd.DataFrame({'title': [title], 'type': [element_type], 'content': [content]})
-                    df = pd.concat([df, new_row], ignore_index=True)
-                    DataManager.save_data(df, 'prompt_elements.csv')
-                    st.success("Element added successfully!")
+                    if DataManager.buffer_row('prompt_elements.csv',
+                                              {'title': title, 'type': element_type, 'content': content}):
+                        st.success("Element added successfully!")
+                    else:
+                        st.info(f"Element queued: {DataManager.pending_count()} unsynced change(s). "
+                                "Press Sync to save them to GitHub.")
 
 class ElementEditor:
     @staticmethod
     def render():
+        # The grid edits saved rows by position, so write any queued additions first
+        DataManager.flush('prompt_elements.csv')
         df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
         if df.empty:
             st.warning("No elements found. Please create some elements first.")
@@ -220,7 +595,8 @@ class ElementEditor:
 
         col1, _ = st.columns(2)
         with col1:
-            all_types = ['All'] + sorted(df['type'].unique().tolist())
+            # Types in use, in ELEMENT_TYPES order, straight from the category codes
+            all_types = ['All'] + df['type'].cat.remove_unused_categories().cat.categories.tolist()
             selected_type = st.selectbox("Filter by Type", all_types, key="filter_type")
 
         filtered_df = df if selected_type == 'All' else df[df['type'] == selected_type]
@@ -228,26 +604,44 @@ class ElementEditor:
             st.warning(f"No elements found for type: {selected_type}")
             return
 
-        for index, row in filtered_df.iterrows():
-            with st.expander(f"{row['title']} ({row['type']})", expanded=False):
-                c1, c2 = st.columns(2)
-                with c1:
-                    nt = st.text_input("Title", value=row['title'], key=f"title_{index}")
-                    ntype = st.selectbox("Type", ELEMENT_TYPES, index=ELEMENT_TYPES.index(row['type']), key=f"type_{index}")
-                with c2:
-                    nc = st.text_area("Content", value=row['content'], key=f"content_{index}", height=100)
-                u1, u2 = st.columns(2)
-                with u1:
-                    if st.button("Update", key=f"update_{index}"):
-                        df.at[index, 'title'] = nt
-                        df.at[index, 'type'] = ntype
-                        df.at[index, 'content'] = nc
-                        DataManager.save_data(df, 'prompt_elements.csv')
-                        st.success("Updated successfully!")
-                with u2:
-                    if st.button("Delete", key=f"delete_{index}"):
-                        DataManager.save_data(df.drop(index), 'prompt_elements.csv')
-                        st.success("Deleted successfully!")
+        # One grid for every row (edits batch up until Save) instead of 5 widgets per element
+        # A range index keeps hide_index working (a filtered view's labels would show up as an
+        # editable column); _save_changes maps positions back through filtered_df.index
+        st.data_editor(
+            filtered_df.reset_index(drop=True), num_rows="dynamic", key="elem_editor", hide_index=True,
+            width="stretch",
+            column_config={
+                'title': st.column_config.TextColumn("Title", required=True),
+                'type': st.column_config.SelectboxColumn("Type", options=ELEMENT_TYPES, required=True),
+                'content': st.column_config.TextColumn("Content", width="large"),
+            },
+        )
+        st.button("Save changes", key="save_elements",
+                  on_click=ElementEditor._save_changes, args=(df, filtered_df))
+
+    @staticmethod
+    def _save_changes(df: pd.DataFrame, view: pd.DataFrame) -> None:
+        """Apply the data_editor's pending edits/adds/deletes to df and save once."""
+        changes = st.session_state.get("elem_editor") or {}
+        out = df.copy()
+        # edited_rows / deleted_rows are positions within the displayed (filtered) view
+        for pos, values in changes.get("edited_rows", {}).items():
+            # One setter per edited row, covering all of its changed cells (data columns only)
+            values = {c: v for c, v in values.items() if c in CSV_COLUMNS}
+            if values:
+                out.loc[view.index[int(pos)], list(values)] = list(values.values())
+        out = out.drop(index=[view.index[int(pos)] for pos in changes.get("deleted_rows", [])])
+        added = [r for r in changes.get("added_rows", []) if r.get("title")]
+        if added:
+            out = pd.concat([out, pd.DataFrame(added, columns=CSV_COLUMNS)], ignore_index=True)
+        # Drop the applied deltas so they aren't replayed on top of the reloaded data
+        st.session_state.pop("elem_editor", None)
+        # Edits that put every value back (or no edits at all) cost no write
+        if out.equals(df):
+            st.info("No changes to save.")
+            return
+        DataManager.save_data(out, 'prompt_elements.csv')
+        st.success("Changes saved!")
 
 # =========================
 # Prompt Builder
@@ -255,25 +649,30 @@ class ElementEditor:
 class PromptBuilder:
     @staticmethod
     def render():
-        df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
+        df = DataManager.load_pending('prompt_elements.csv')
+        # Plain-Python views built once per run: titles per type, and title -> content
+        # (first row wins for duplicate titles); nothing below touches pandas
+        titles = {t: g['title'].tolist() for t, g in df.groupby('type', sort=False, observed=True)}
+        first = df.drop_duplicates('title')
+        lookup = dict(zip(first['title'].tolist(), first['content'].tolist()))
 
         # --- Selection UI (3 columns)
         c1, c2, c3 = st.columns(3)
         selections = {}
         with c1:
-            selections['role'] = PromptBuilder._sec("Role", 'role', df)
-            selections['goal'] = PromptBuilder._sec("Goal", 'goal', df)
+            selections['role'] = PromptBuilder._sec("Role", 'role', titles.get('role', []))
+            selections['goal'] = PromptBuilder._sec("Goal", 'goal', titles.get('goal', []))
         with c2:
-            selections['audience'] = PromptBuilder._sec("Target Audience", 'audience', df, True)
-            selections['context']  = PromptBuilder._sec("Context", 'context', df, True)
+            selections['audience'] = PromptBuilder._sec("Target Audience", 'audience', titles.get('audience', []), True)
+            selections['context']  = PromptBuilder._sec("Context", 'context', titles.get('context', []), True)
         with c3:
-            selections['output'] = PromptBuilder._sec("Output", 'output', df, True)
-            selections['tone']   = PromptBuilder._sec("Tone", 'tone', df)
+            selections['output'] = PromptBuilder._sec("Output", 'output', titles.get('output', []), True)
+            selections['tone']   = PromptBuilder._sec("Tone", 'tone', titles.get('tone', []))
 
         # --- Build prompt (checkboxes are at bottom; preserve current values)
-        auto = st.session_state.get("auto_update_prompt", True)
-        recursive = st.session_state.get("recursive_feedback", False)
-        prompt, missing = PromptBuilder._build(selections, df, recursive)
+        auto = st.session_state.setdefault("auto_update_prompt", True)
+        recursive = st.session_state.setdefault("recursive_feedback", False)
+        prompt, missing = PromptBuilder._build(selections, lookup, recursive)
 
         if missing:
             st.warning(
@@ -303,8 +702,11 @@ class PromptBuilder:
                 elif not name:
                     st.warning("Please enter a Prompt Name.")
                 else:
-                    DataManager.save_prompt(name, text_to_save)
-                    st.success(f"Saved: {name}")
+                    if DataManager.save_prompt(name, text_to_save):
+                        st.success(f"Saved: {name}")
+                    else:
+                        st.info(f"Prompt queued: {DataManager.pending_count()} unsynced change(s). "
+                                "Press Sync to save them to GitHub.")
         with clear_col:
             st.button("Clear Form", key="clear_form_btn", on_click=clear_form_state, use_container_width=True)
 
@@ -318,15 +720,14 @@ class PromptBuilder:
         with toggles_col:
             t1, t2 = st.columns(2)
             with t1:
-                st.checkbox("Auto-update", key="auto_update_prompt", value=auto)
+                st.checkbox("Auto-update", key="auto_update_prompt")
             with t2:
-                st.checkbox("Request recursive feedback", key="recursive_feedback", value=recursive)
+                st.checkbox("Request recursive feedback", key="recursive_feedback")
 
     @staticmethod
-    def _sec(title: str, element_type: str, df: pd.DataFrame, multi: bool = False) -> Dict[str, Any]:
+    def _sec(title: str, element_type: str, titles: List[str], multi: bool = False) -> Dict[str, Any]:
         """Render a selectbox/multiselect for a section, with 'Skip' and 'Write your own'."""
-        elements = df[df['type'] == element_type]
-        options = ["Skip", "Write your own"] + elements['title'].tolist()
+        options = ["Skip", "Write your own", *titles]
 
         if multi:
             selected = st.multiselect(title, options, key=f"select_{element_type}")
@@ -338,93 +739,84 @@ class PromptBuilder:
            (not multi and selected == "Write your own"):
             custom_content = st.text_input(f"Custom {title}", key=f"custom_{element_type}")
 
-        return {"selected": selected, "custom": custom_content, "elements": elements}
+        return {"selected": selected, "custom": custom_content}
 
     @staticmethod
-    def _content_or_title(df: pd.DataFrame, title: str) -> Tuple[str, str]:
+    def _content_or_title(lookup: Dict[str, Any], title: str) -> Tuple[str, str]:
         """Return (content, missing_label). If content empty, use title and mark missing."""
-        row = df[df['title'] == title]
-        if row.empty:
+        if title not in lookup:
             return "", ""
-        c = str(row['content'].values[0]).strip()
+        c = str(lookup[title]).strip()
         return (c, "") if c else (title, title)
 
     @staticmethod
-    def _build(selections: Dict[str, Dict], df: pd.DataFrame, recursive: bool) -> Tuple[str, list]:
+    def _build(selections: Dict[str, Dict], lookup: Dict[str, Any], recursive: bool) -> Tuple[str, list]:
         parts, missing = [], []
+        chosen = [(section, data) for section, data in selections.items()
+                  if data['selected'] not in ("Skip", [], ["Skip"])]
+        if not chosen:
+            return "", missing
 
-        for section, data in selections.items():
+        for section, data in chosen:
             sel = data['selected']
-            if (isinstance(sel, str) and sel == "Skip") or (isinstance(sel, list) and (not sel or sel == ["Skip"])):
-                continue
-
-            title = "Target Audience" if section == "audience" else section.title()
+            title = SECTION_TITLES[section]
 
-            # Multi sections
-            if section in ['audience', 'context', 'output']:
+            # Multi sections (sel is a list); custom text replaces the picked elements
+            if section in MULTI_SECTIONS:
                 if data['custom']:
                     content = data['custom']
-                elif isinstance(sel, list):
+                else:
                     snips = []
-                    for t in [s for s in sel if s not in ("Skip", "Write your own")]:
-                        c, m = PromptBuilder._content_or_title(df, t)
+                    for t in sel:
+                        if t in ("Skip", "Write your own"):
+                            continue
+                        c, m = PromptBuilder._content_or_title(lookup, t)
                         if m: missing.append(f"{title} → {m}")
                         if c: snips.append(c)
-                    content = "\n".join(snips)
-                else:
-                    if sel not in ("Skip", "Write your own"):
-                        c, m = PromptBuilder._content_or_title(df, sel)
-                        if m: missing.append(f"{title} → {m}")
-                        content = c
-                    else:
-                        content = ""
+                    # A single pick needs no join
+                    content = snips[0] if len(snips) == 1 else "\n".join(snips)
                 if content:
                     parts.append(f"{title}:\n{content}")
 
-            # Single sections
+            # Single sections (sel is a str)
+            elif sel == "Write your own":
+                if data['custom']:
+                    parts.append(f"{title}: {data['custom']}")
             else:
-                if isinstance(sel, str) and sel == "Write your own":
-                    content = data['custom']
-                elif isinstance(sel, str):
-                    c, m = PromptBuilder._content_or_title(df, sel)
-                    if m: missing.append(f"{title} → {m}")
-                    content = c
-                else:
-                    content = ""
-                if content:
-                    parts.append(f"{title}: {content}")
-
-        prompt = "\n\n".join(parts)
-        if recursive and prompt:
-            prompt += (
-                "\n\nBefore you provide the response, please ask me any questions that you feel could "
-                "help you craft a better response. If you feel you have enough information to craft this response, "
-                "please just provide it."
-            )
-        return prompt, missing
+                c, m = PromptBuilder._content_or_title(lookup, sel)
+                if m: missing.append(f"{title} → {m}")
+                if c:
+                    parts.append(f"{title}: {c}")
+
+        if recursive and parts:
+            parts.append(_RECURSIVE_FEEDBACK)
+        return "\n\n".join(parts), missing
 
 # =========================
 # Clear form helper (resets selects/multiselects/customs/prompt name + text)
 # =========================
+# Values "Clear Form" resets the builder widgets to (lists are copied on use)
+_FORM_DEFAULTS = {
+    "select_role": "Skip",
+    "select_goal": "Skip",
+    "select_tone": "Skip",
+    "select_audience": [],
+    "select_context": [],
+    "select_output": [],
+    "custom_role": "",
+    "custom_goal": "",
+    "custom_tone": "",
+    "custom_audience": "",
+    "custom_context": "",
+    "custom_output": "",
+    "generated_prompt": "",
+    "prompt_name": "",
+}
+
 def clear_form_state():
-    defaults = {
-        "select_role": "Skip",
-        "select_goal": "Skip",
-        "select_tone": "Skip",
-        "select_audience": [],
-        "select_context": [],
-        "select_output": [],
-        "custom_role": "",
-        "custom_goal": "",
-        "custom_tone": "",
-        "custom_audience": "",
-        "custom_context": "",
-        "custom_output": "",
-        "generated_prompt": "",
-        "prompt_name": "",
-    }
-    for k, v in defaults.items():
-        st.session_state[k] = v
+    # Assign the defaults (not pop) so every widget shows them on the next run
+    for k, v in _FORM_DEFAULTS.items():
+        st.session_state[k] = list(v) if isinstance(v, list) else v
     # Leave 'auto_update_prompt' and 'recursive_feedback' untouched.
 
 # =========================
@@ -433,62 +825,76 @@ def clear_form_state():
 class PromptBrowser:
     @staticmethod
     def render():
-        df = DataManager.load_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
+        df = DataManager.load_history()
         if df.empty:
             st.warning("No prompts found. Please create and save some prompts first.")
             return
-        try:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df = df.sort_values("timestamp", ascending=False)
-        except Exception:
-            pass
-        for i, row in df.iterrows():
-            with st.expander(f"{row['name']} - {row['timestamp']}", expanded=False):
-                st.text_area("Prompt Content", value=row['prompt'], height=150, key=f"prompt_{i}")
+        # Saves append in time order, so history is normally already sorted: an O(N)
+        # check plus a reversed view replaces the sort (merged backups still get sorted)
+        if not df["timestamp"].is_monotonic_increasing:
+            df = df.sort_values("timestamp", kind="stable", na_position="first")
+        df = df.iloc[::-1]
+        # One table + one viewer instead of an expander/text_area per prompt
+        st.dataframe(df[['name', 'timestamp']], width="stretch", hide_index=True)
+        # Labels built in one pass over plain lists rather than two .at lookups per option
+        labels = dict(zip(df.index, (f"{n} - {t}" for n, t in
+                                     zip(df['name'].tolist(), df['timestamp'].tolist()))))
+        i = st.selectbox("View prompt", df.index, key="view_prompt", format_func=labels.__getitem__)
+        st.text_area("Prompt Content", value=df.at[i, 'prompt'], height=150, key=f"prompt_{i}")
 
 # =========================
 # Backup / Restore Tab
 # =========================
+def _merge_rows(base: pd.DataFrame, new: pd.DataFrame, key: List[str]) -> pd.DataFrame:
+    """Union of base and new on key; rows from new replace base rows with the same key."""
+    # Hash each row's key to one int64 once; dedup and membership then compare integers
+    new_keys = pd.util.hash_pandas_object(new[key], index=False).to_numpy()
+    keep = ~pd.Series(new_keys).duplicated(keep="last").to_numpy()
+    new = new[keep]
+    replaced = pd.util.hash_pandas_object(base[key], index=False).isin(new_keys[keep]).to_numpy()
+    return pd.concat([base[~replaced], new], ignore_index=True)
+
 def render_backup_restore_tab():
     st.subheader("Backup / Restore")
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("**Download current data**")
-        elements_df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
-        buf1 = io.StringIO()
-        elements_df.to_csv(buf1, index=False)
-        st.download_button("Download prompt_elements.csv", data=buf1.getvalue(),
+        DataManager.prefetch(['prompt_elements.csv', 'prompt_history.csv'])
+        # Callables defer the CSV serialization until the button is actually clicked
+        elements_df = DataManager.load_pending('prompt_elements.csv')
+        st.download_button("Download prompt_elements.csv", data=lambda: _to_bytes(elements_df, "csv"),
                            file_name="prompt_elements.csv", mime="text/csv", key="dl_elements")
 
-        history_df = DataManager.load_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
-        buf2 = io.StringIO()
-        history_df.to_csv(buf2, index=False)
-        st.download_button("Download prompt_history.csv", data=buf2.getvalue(),
+        history_df = DataManager.load_history()
+        st.download_button("Download prompt_history.csv", data=lambda: _to_bytes(history_df, "csv"),
                            file_name="prompt_history.csv", mime="text/csv", key="dl_history")
 
     with col2:
         st.markdown("**Restore / merge from a backup**")
+        # An upload stays in its widget across reruns; merge each file only once
+        merged = st.session_state.setdefault("_merged_uploads", set())
         up1 = st.file_uploader("Upload prompt_elements.csv", type=["csv"], key="up_elements")
-        if up1 is not None:
+        if up1 is not None and up1.file_id not in merged:
             try:
-                new_df = pd.read_csv(up1)
+                new_df = _read_csv(up1, CSV_COLUMNS)
                 base_df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
-                combined = pd.concat([base_df, new_df], ignore_index=True)
-                combined.drop_duplicates(subset=CSV_COLUMNS, keep="last", inplace=True)
+                combined = _merge_rows(base_df, new_df, CSV_KEY)
+                combined['type'] = _type_categorical(combined['type'])
                 DataManager.save_data(combined, 'prompt_elements.csv')
+                merged.add(up1.file_id)
                 st.success("Elements merged and saved.")
             except Exception as e:
                 st.error(f"Failed to import elements: {e}")
 
         up2 = st.file_uploader("Upload prompt_history.csv", type=["csv"], key="up_history")
-        if up2 is not None:
+        if up2 is not None and up2.file_id not in merged:
             try:
-                new_hist = pd.read_csv(up2)
+                new_hist = _read_csv(up2, PROMPT_HISTORY_COLUMNS)
                 base_hist = DataManager.load_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
-                combined = pd.concat([base_hist, new_hist], ignore_index=True)
-                combined.drop_duplicates(subset=PROMPT_HISTORY_COLUMNS, keep="last", inplace=True)
+                combined = _merge_rows(base_hist, new_hist, PROMPT_HISTORY_KEY)
                 DataManager.save_data(combined, 'prompt_history.csv')
+                merged.add(up2.file_id)
                 st.success("History merged and saved.")
             except Exception as e:
                 st.error(f"Failed to import history: {e}")
@@ -498,23 +904,38 @@ def render_backup_restore_tab():
 # =========================
 def main():
     st.set_page_config(layout="wide", page_title="CTM Enterprises Prompt Creation Tool")
-    set_theme()
+    st.markdown(_THEME_CSS, unsafe_allow_html=True)
     st.title("CTM Enterprises Prompt Creation Tool")
 
-    tabs = st.tabs([
-        "Element Creator", "Element Editor", "Prompt Builder",
-        "Browse Prompts", "Backup / Restore"
-    ])
-    with tabs[0]:
-        ElementCreator.render()
-    with tabs[1]:
-        ElementEditor.render()
-    with tabs[2]:
-        PromptBuilder.render()
-    with tabs[3]:
-        PromptBrowser.render()
-    with tabs[4]:
-        render_backup_restore_tab()
+    # st.tabs runs every tab's body on each rerun; a radio lets us run only the active one
+    sections = {
+        "Element Creator": ElementCreator.render,
+        "Element Editor": ElementEditor.render,
+        "Prompt Builder": PromptBuilder.render,
+        "Browse Prompts": PromptBrowser.render,
+        "Backup / Restore": render_backup_restore_tab,
+    }
+    # Streamlit drops state for widgets that aren't rendered; re-assigning keeps it
+    for k in list(st.session_state.keys()):
+        if k.startswith(PERSISTED_KEY_PREFIXES):
+            st.session_state[k] = st.session_state[k]
+    active = st.radio("Section", list(sections), horizontal=True,
+                      key="active_section", label_visibility="collapsed")
+    # Leaving a section is a natural point to write buffered rows
+    if st.session_state.get("_last_section", active) != active:
+        DataManager.flush()
+    st.session_state["_last_section"] = active
+    # Failed background writes are retried until they land; say so on every run until then
+    writer, where = DataManager._writer()
+    for target, err in writer.errors().items():
+        st.warning(f"{where} save of {target} is failing ({err}); retrying. "
+                   "Keep this app running until this message clears, or the change is lost.")
+    sync = st.empty()
+    sections[active]()
+    # Filled after the section so rows it just queued are counted
+    pending = DataManager.pending_count()
+    if pending:
+        sync.button(f"Sync {pending} pending change(s)", key="flush_btn", on_click=DataManager.flush)
 
 if __name__ == "__main__":
     main()